@@ -0,0 +1,15 @@
+# AOT-збірка ядра графіка в розширення _schedule_native поруч із цим файлом:
+#     python build_kernel.py
+# Якщо розширення немає, schedule_kernel компілює те саме ядро через numba.njit.
+import os
+
+from numba.pycc import CC
+
+from schedule_kernel import SIGNATURE, _simulate
+
+cc = CC("_schedule_native")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.export("simulate", SIGNATURE)(_simulate)
+
+if __name__ == "__main__":
+    cc.compile()
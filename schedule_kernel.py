@@ -0,0 +1,66 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # Без numba той самий цикл виконується як звичайний Python
+    def njit(*args, **kwargs):
+        def wrap(func):
+            return func
+        return wrap
+
+
+# Сигнатура ядра для AOT-збірки (build_kernel.py)
+SIGNATURE = "Tuple((f8[:], f8[:], f8[:], f8[:], f8[:], i8))(f8, f8, f8, f8[:], i8)"
+
+
+# Окремий модуль: Streamlit перевиконує streamlit_app.py на кожен rerun,
+# а імпортований модуль (і скомпільоване ядро) живе весь час процесу.
+def _simulate(principal, monthly_rate, base_payment, extras, max_months):
+    payment = np.empty(max_months)
+    principal_paid = np.empty(max_months)
+    interest = np.empty(max_months)
+    extra_paid = np.empty(max_months)
+    balance = np.empty(max_months)
+
+    remaining_balance = principal
+    n = 0
+    for i in range(1, max_months + 1):
+        if remaining_balance <= 0.01:
+            break
+
+        interest_payment = remaining_balance * monthly_rate
+
+        # Доплата місяця (щомісячна + ручна) — один індексний доступ
+        extra = extras[i]
+
+        total_payment_attempt = base_payment + extra
+
+        if total_payment_attempt >= remaining_balance + interest_payment:
+            total_payment = remaining_balance + interest_payment
+            principal_payment = remaining_balance
+            remaining_balance = 0.0
+            extra_paid_in_record = max(0.0, total_payment - base_payment)
+        else:
+            total_payment = total_payment_attempt
+            principal_payment = total_payment - interest_payment
+            remaining_balance -= principal_payment
+            extra_paid_in_record = extra
+
+        payment[n] = total_payment
+        principal_paid[n] = principal_payment
+        interest[n] = interest_payment
+        extra_paid[n] = extra_paid_in_record
+        balance[n] = remaining_balance
+        n += 1
+
+    return payment, principal_paid, interest, extra_paid, balance, n
+
+
+try:
+    # Попередньо скомпільоване розширення (python build_kernel.py) — без JIT на холодному старті
+    from _schedule_native import simulate
+except ImportError:
+    # Явна сигнатура компілює ядро одразу під час імпорту (або бере його з кешу numba):
+    # один раз на процес, без виведення типів на кожному виклику
+    simulate = njit(SIGNATURE, cache=True, fastmath=True, boundscheck=False)(_simulate)
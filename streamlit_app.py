@@ -1,8 +1,14 @@
+import math
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from datetime import date
-from dateutil.relativedelta import relativedelta
+from functools import partial
+
+from schedule_kernel import simulate
 
 # --- Налаштування сторінки ---
 st.set_page_config(
@@ -34,71 +40,224 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Логіка розрахунку ---
-@st.cache_data
-def calculate_schedule(principal, annual_rate, start_date, 
-                       years=None, fixed_payment=None, 
-                       monthly_extra=0, irregular_payments=None):
-    if irregular_payments is None:
-        irregular_payments = {}
+def _schedule_frame(start_date, payment, principal_paid, interest, extra, balance):
+    # Графік збираємо з готових колонок, без проміжного списку словників
+    n = len(payment)
+    return pd.DataFrame({
+        "Місяць": np.arange(1, n + 1, dtype=np.int32),
+        "Дата": pd.date_range(start_date, periods=n, freq=pd.DateOffset(months=1)),
+        "Платіж": payment,
+        "Тіло": principal_paid,
+        "Відсотки": interest,
+        "Достроково": extra, # Ця колонка для відображення факту
+        "Залишок": balance
+    }, copy=False)
 
-    monthly_rate = annual_rate / 12 / 100
-    schedule = []
-    remaining_balance = principal
-    current_date = start_date
-    
-    # Визначення базового платежу
+def _annuity_schedule(principal, monthly_rate, base_payment, monthly_extra, start_date, max_months):
+    # Без ручних погашень залишок має замкнену форму:
+    # B_k = B0*(1+r)^k - P*((1+r)^k - 1)/r, тож рахуємо всі місяці одразу
+    payment = base_payment + monthly_extra
+    months = np.arange(1, max_months + 1)
+    if monthly_rate > 0:
+        growth = np.power(1 + monthly_rate, months)
+        balance = principal * growth - payment * (growth - 1) / monthly_rate
+    else:
+        balance = principal - payment * months
+
+    # Залишок монотонно спадає, тож місяць погашення шукаємо бінарним пошуком
+    n = min(int(np.searchsorted(-balance, -0.01)) + 1, max_months)
+    balance = balance[:n]
+    prev_balance = np.concatenate(([principal], balance[:-1]))
+    interest = prev_balance * monthly_rate
+    total_payment = np.full(n, float(payment))
+    extra = np.full(n, float(monthly_extra))
+
+    # Останній платіж закриває залишок разом з відсотками
+    if balance[-1] <= 0:
+        total_payment[-1] = prev_balance[-1] + interest[-1]
+        extra[-1] = max(0.0, total_payment[-1] - base_payment)
+        balance[-1] = 0.0
+
+    return _schedule_frame(start_date, total_payment, total_payment - interest, interest, extra, balance)
+
+def _base_payment(principal, monthly_rate, years=None, fixed_payment=None):
+    # Визначення базового платежу; None — якщо платіж не покриває відсотки
     if fixed_payment is not None:
-        base_payment = fixed_payment
         first_month_interest = principal * monthly_rate
-        if base_payment <= first_month_interest:
-            return pd.DataFrame()
+        if fixed_payment <= first_month_interest:
+            return None
+        return fixed_payment
+
+    total_months_planned = years * 12
+    if monthly_rate > 0:
+        # Ступінь (1+r)^n рахуємо один раз
+        growth = (1 + monthly_rate) ** total_months_planned
+        return principal * monthly_rate * growth / (growth - 1)
+    return principal / total_months_planned
+
+def _months_bound(principal, monthly_rate, base_payment, limit=600):
+    # Доплати лише скорочують графік, тож термін за базовим платежем — верхня межа
+    if monthly_rate > 0:
+        months = math.log(base_payment / (base_payment - principal * monthly_rate)) / math.log1p(monthly_rate)
     else:
-        total_months_planned = years * 12
-        if monthly_rate > 0:
-            base_payment = principal * (monthly_rate * (1 + monthly_rate)**total_months_planned) / ((1 + monthly_rate)**total_months_planned - 1)
-        else:
-            base_payment = principal / total_months_planned
+        months = principal / base_payment
+    # +1 місяць запасу на похибку округлення в останньому платежі
+    return min(math.ceil(months) + 1, limit)
 
-    max_months = 600 
+def _run_schedule(principal, monthly_rate, start_date, base_payment,
+                  monthly_extra=0, irregular_payments=()):
+    max_months = _months_bound(principal, monthly_rate, base_payment)
+
+    # Швидкий шлях: без ручних погашень графік рахується векторно
+    if not irregular_payments:
+        return _annuity_schedule(principal, monthly_rate, base_payment, monthly_extra, start_date, max_months)
     
-    for i in range(1, max_months + 1):
-        if remaining_balance <= 0.01:
-            break
+    # Доплати розкладаємо в масив за номером місяця: щомісячна плюс ручні з таблиці
+    extras = np.full(max_months + 1, float(monthly_extra))
+    for month, amount in irregular_payments:
+        if 0 < month <= max_months:
+            extras[month] += amount
 
-        interest_payment = remaining_balance * monthly_rate
-        current_base_payment = base_payment
-        
-        extra = monthly_extra
-        # Додаємо ручні погашення з таблиці
-        if i in irregular_payments:
-            extra += irregular_payments[i]
-            
-        total_payment_attempt = current_base_payment + extra
-        
-        if total_payment_attempt >= remaining_balance + interest_payment:
-            total_payment = remaining_balance + interest_payment
-            principal_payment = remaining_balance
-            remaining_balance = 0
-            extra_paid_in_record = max(0, total_payment - (interest_payment + (base_payment - interest_payment)))
-        else:
-            total_payment = total_payment_attempt
-            principal_payment = total_payment - interest_payment
-            remaining_balance -= principal_payment
-            extra_paid_in_record = extra
-
-        schedule.append({
-            "Місяць": i,
-            "Дата": current_date,
-            "Платіж": total_payment,
-            "Тіло": principal_payment,
-            "Відсотки": interest_payment,
-            "Достроково": extra_paid_in_record, # Ця колонка для відображення факту
-            "Залишок": remaining_balance
-        })
-        
-        current_date += relativedelta(months=1)
+    payment, principal_paid, interest, extra, balance, n = simulate(
+        float(principal), float(monthly_rate), float(base_payment), extras, max_months
+    )
+
+    return _schedule_frame(start_date, payment[:n], principal_paid[:n], interest[:n], extra[:n], balance[:n])
+
+# irregular_payments — відсортований кортеж пар (місяць, сума): незмінний
+# аргумент хешується швидко і дає той самий ключ кешу для тих самих правок
+def calculate_schedule(principal, annual_rate, start_date, 
+                       years=None, fixed_payment=None, 
+                       monthly_extra=0, irregular_payments=()):
+    monthly_rate = annual_rate / 12 / 100
+    base_payment = _base_payment(principal, monthly_rate, years=years, fixed_payment=fixed_payment)
+    if base_payment is None:
+        return pd.DataFrame()
+    return _run_schedule(principal, monthly_rate, start_date, base_payment, monthly_extra, irregular_payments)
+
+# Базовий графік залежить лише від параметрів кредиту, тож має окремий кеш,
+# який не скидається, поки користувач змінює дострокові погашення
+@st.cache_data(show_spinner=False, max_entries=64)
+def base_schedule(principal, annual_rate, start_date, years=None, fixed_payment=None):
+    return calculate_schedule(principal, annual_rate, start_date, years=years, fixed_payment=fixed_payment)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def real_schedule(principal, annual_rate, start_date, years, fixed_payment,
+                  monthly_extra, irregular_payments):
+    return calculate_schedule(
+        principal, annual_rate, start_date,
+        years=years, fixed_payment=fixed_payment,
+        monthly_extra=monthly_extra, irregular_payments=irregular_payments
+    )
+
+# Параметр _df Streamlit не хешує: ключем кешу є кортеж вхідних параметрів графіка
+@st.cache_data(show_spinner=False, max_entries=64)
+def schedule_csv(_df, schedule_key):
+    return _df.to_csv(index=False, date_format="%Y-%m-%d").encode('utf-8')
+
+# --- Підготовка графіків ---
+def _lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: n_out точок, що зберігають форму кривої
+    n = len(x)
+    if n <= n_out:
+        return x, y
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], edges[b + 1]
+        next_end = edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Обираємо точку кошика з найбільшою площею трикутника з попередньою обраною та середнім наступного
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        idx[b + 1] = a
+    return x[idx], y[idx]
+
+def balance_points(df, max_points=200, n_out=150):
+    # Для довгих графіків проріджуємо криву залишку — візуально без втрат, а браузеру менше роботи
+    x, y = df["Місяць"].values, df["Залишок"].values
+    if len(x) > max_points:
+        return _lttb(x, y, n_out)
+    return x, y
+
+# Побудова фігур кешується між сесіями за масивами даних. cache_data віддає кожній
+# сесії власну копію, тож її можна далі оновлювати через update_traces
+@st.cache_data(show_spinner=False, max_entries=32)
+def balance_figure(base_x, base_y, real_x, real_y):
+    # Дві траси напряму через graph_objects (WebGL), без довгої таблиці та групування px.line
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=base_x, y=base_y, mode="lines", name="План (без доплат)", line=dict(color="#EF553B")))
+    fig.add_trace(go.Scattergl(x=real_x, y=real_y, mode="lines", name="Факт (з доплатами)", line=dict(color="#00CC96")))
+    fig.update_layout(legend=dict(orientation="h", y=1.02, x=1), margin=dict(l=10, r=10, t=30, b=10), height=350,
+                      xaxis_title=None, yaxis_title="Залишок", hovermode="x unified")
+    return fig
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cost_figure(loan_amount, total_interest):
+    fig = px.pie(names=['Тіло кредиту', 'Сплачені відсотки'], 
+                 values=[loan_amount, total_interest], 
+                 hole=0.4, color_discrete_sequence=['#636EFA', '#EF553B'])
+    fig.update_layout(margin=dict(t=20, b=20, l=10, r=10), height=300)
+    return fig
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def payments_figure(months, interest, principal_paid, extra):
+    df_parts = pd.DataFrame({"Місяць": months, "Відсотки": interest, "Тіло": principal_paid, "Достроково": extra})
+    fig = px.bar(df_parts, x="Місяць", y=["Відсотки", "Тіло", "Достроково"],
+                 labels={"value": "Сума (грн)", "Місяць": "№ Місяця"},
+                 color_discrete_map={"Відсотки": "#EF553B", "Тіло": "#636EFA", "Достроково": "#00CC96"})
+    fig.update_layout(legend=dict(orientation="h", y=1.02, x=1, title=None), margin=dict(l=10, r=10, t=30, b=10), height=350, xaxis_title=None)
+    return fig
+
+# Редактор дострокових погашень у формі: правки не перезапускають скрипт,
+# перерахунок іде один раз — після натискання "Застосувати"
+def prepayment_editor(df_base):
+    with st.expander("🚀 Дострокове погашення (Редагування таблиці)", expanded=False), st.form("prepayment_form", border=False):
+        st.caption("Введіть суми: регулярні (щомісяця) або точкові (прямо в таблиці), потім натисніть «Застосувати».")
+    
+        # Глобальний щомісячний платіж
+        monthly_extra_pay = st.number_input("Щомісячна доплата (+грн до кожного платежу)", min_value=0, value=0, step=500)
+    
+        st.divider()
+        st.write("🗓 **Графік погашень (Редагуйте колонку 'Додати вручну')**")
+    
+        # Підготовка даних для редактора
+        # Ми беремо базовий графік і додаємо пусту колонку для вводу користувача
+        edit_prep_df = df_base[['Місяць', 'Дата', 'Платіж']].copy()
+        edit_prep_df['Дата'] = edit_prep_df['Дата'].dt.strftime("%d.%m.%Y")
+        edit_prep_df['Додати вручну'] = 0.0  # Колонка для редагування
+    
+        # Конфігурація редактора колонок
+        column_config = {
+            "Місяць": st.column_config.NumberColumn(disabled=True, width="small"),
+            "Дата": st.column_config.TextColumn(disabled=True),
+            "Платіж": st.column_config.NumberColumn("План. платіж", format="%d ₴", disabled=True),
+            "Додати вручну": st.column_config.NumberColumn("Додати (+грн)", min_value=0, step=1000, required=True)
+        }
+    
+        # ВІДОБРАЖЕННЯ ТАБЛИЦІ ДЛЯ РЕДАГУВАННЯ
+        edited_schedule = st.data_editor(
+            edit_prep_df, 
+            column_config=column_config, 
+            hide_index=True, 
+            use_container_width=True,
+            height=300,
+            key="editor_key" # Важливо для збереження стану
+        )
+    
+        # Збираємо дані з таблиці у відсортовані пари (номер_місяця, сума)
+        manual_sums = pd.to_numeric(edited_schedule['Додати вручну'], errors='coerce')
+        manual_mask = manual_sums > 0
+        manual_by_month = manual_sums[manual_mask].groupby(edited_schedule.loc[manual_mask, 'Місяць'].astype(int)).sum()
+        irregular_payments_key = tuple(zip(manual_by_month.index.tolist(), manual_by_month.tolist()))
 
-    return pd.DataFrame(schedule)
+        st.form_submit_button("Застосувати")
+
+    return monthly_extra_pay, irregular_payments_key
 
 # --- Інтерфейс ---
 st.title("💸 Кредитний Калькулятор")
@@ -118,79 +277,61 @@ with st.expander("⚙️ Параметри кредиту", expanded=True):
     target_years = None
     target_payment = None
 
+    # Мінімальний платіж рахуємо один раз — для підпису, min_value віджета та перевірки
+    # Той самий вираз ставки, що й у calculate_schedule, щоб перевірка збігалася до біта
+    monthly_rate = interest_rate / 12 / 100
+    first_month_interest = loan_amount * monthly_rate
+    min_payment = int(first_month_interest) + 1
+
     if calc_mode == "За терміном":
         target_years = st.slider("Термін (років):", 1, 30, 5)
     else:
-        min_payment = (loan_amount * (interest_rate / 100 / 12)) + 1
         target_payment = st.number_input(
-            f"Платіж (мін. {int(min_payment)} грн)", 
-            min_value=float(int(min_payment)), 
-            value=float(int(min_payment * 1.5)), 
+            f"Платіж (мін. {min_payment} грн)", 
+            min_value=float(min_payment), 
+            value=float(round((first_month_interest + 1) * 1.5)), 
             step=500.0
         )
 
 # Перевірка валідності для "За платежем"
-valid_input = True
-if target_payment is not None:
-    monthly_rate_check = interest_rate / 12 / 100
-    if target_payment <= loan_amount * monthly_rate_check:
-        st.error(f"⚠️ Платіж замалий! Мінімальний: {int(loan_amount * monthly_rate_check) + 1} грн")
-        valid_input = False
+valid_input = target_payment is None or target_payment > first_month_interest
+if not valid_input:
+    st.error(f"⚠️ Платіж замалий! Мінімальний: {min_payment} грн")
 
 if valid_input:
     # --- КРОК 1: Базовий розрахунок ---
     # Спочатку рахуємо графік БЕЗ дострокових, щоб знати структуру таблиці
-    df_base = calculate_schedule(loan_amount, interest_rate, start_date, years=target_years, fixed_payment=target_payment)
+    # Поки параметри кредиту не змінились, беремо готовий графік із сесії без хешування аргументів
+    base_key = (loan_amount, interest_rate, start_date, target_years, target_payment)
+    if st.session_state.get("base_key") != base_key:
+        st.session_state.base_df = base_schedule(loan_amount, interest_rate, start_date, years=target_years, fixed_payment=target_payment)
+        st.session_state.base_key = base_key
+    df_base = st.session_state.base_df
 
     # 2. Налаштування дострокових погашень (В головному меню)
-    with st.expander("🚀 Дострокове погашення (Редагування таблиці)", expanded=False):
-        st.caption("Введіть суми: регулярні (щомісяця) або точкові (прямо в таблиці).")
-        
-        # Глобальний щомісячний платіж
-        monthly_extra_pay = st.number_input("Щомісячна доплата (+грн до кожного платежу)", min_value=0, value=0, step=500)
-        
-        st.divider()
-        st.write("🗓 **Графік погашень (Редагуйте колонку 'Додати вручну')**")
-        
-        # Підготовка даних для редактора
-        # Ми беремо базовий графік і додаємо пусту колонку для вводу користувача
-        edit_prep_df = df_base[['Місяць', 'Дата', 'Платіж']].copy()
-        edit_prep_df['Дата'] = edit_prep_df['Дата'].apply(lambda x: x.strftime("%d.%m.%Y"))
-        edit_prep_df['Додати вручну'] = 0.0  # Колонка для редагування
-        
-        # Конфігурація редактора колонок
-        column_config = {
-            "Місяць": st.column_config.NumberColumn(disabled=True, width="small"),
-            "Дата": st.column_config.TextColumn(disabled=True),
-            "Платіж": st.column_config.NumberColumn("План. платіж", format="%d ₴", disabled=True),
-            "Додати вручну": st.column_config.NumberColumn("Додати (+грн)", min_value=0, step=1000, required=True)
-        }
-        
-        # ВІДОБРАЖЕННЯ ТАБЛИЦІ ДЛЯ РЕДАГУВАННЯ
-        edited_schedule = st.data_editor(
-            edit_prep_df, 
-            column_config=column_config, 
-            hide_index=True, 
-            use_container_width=True,
-            height=300,
-            key="editor_key" # Важливо для збереження стану
-        )
-        
-        # Збираємо дані з таблиці в словник {номер_місяця: сума}
-        irregular_payments_dict = {}
-        for index, row in edited_schedule.iterrows():
-            if row['Додати вручну'] > 0:
-                irregular_payments_dict[row['Місяць']] = row['Додати вручну']
+    # Порожній графік (платіж відхилено) — редактор не показуємо, нижче буде повідомлення про помилку
+    if df_base.empty:
+        monthly_extra_pay, irregular_payments_key = 0, ()
+    else:
+        monthly_extra_pay, irregular_payments_key = prepayment_editor(df_base)
 
     # --- КРОК 2: Фінальний розрахунок ---
-    with st.spinner("Оновлюємо розрахунки..."):
-        # Рахуємо реальний графік з урахуванням вводу користувача
-        df_real = calculate_schedule(
-            loan_amount, interest_rate, start_date, 
-            years=target_years, fixed_payment=target_payment,
-            monthly_extra=monthly_extra_pay, 
-            irregular_payments=irregular_payments_dict
-        )
+    if monthly_extra_pay or irregular_payments_key:
+        real_key = base_key + (monthly_extra_pay, irregular_payments_key)
+        if st.session_state.get("real_key") != real_key:
+            with st.spinner("Оновлюємо розрахунки..."):
+                # Рахуємо реальний графік з урахуванням вводу користувача
+                st.session_state.real_df = real_schedule(
+                    loan_amount, interest_rate, start_date,
+                    target_years, target_payment,
+                    monthly_extra_pay, irregular_payments_key
+                )
+            st.session_state.real_key = real_key
+        df_real = st.session_state.real_df
+    else:
+        # Без доплат реальний графік збігається з базовим
+        real_key = base_key
+        df_real = df_base
 
     if df_real.empty:
         st.error("Помилка розрахунку.")
@@ -209,53 +350,115 @@ if valid_input:
 
         st.divider()
         c1, c2, c3 = st.columns(3)
-        c1.metric("Всього відсотків", f"{int(total_int_real):,} грн", delta=f"-{int(saved_money):,} грн", delta_color="inverse")
+        c1.metric("Всього відсотків", f"{total_int_real:,.0f} грн", delta=f"-{saved_money:,.0f} грн", delta_color="inverse")
         c2.metric("Реальний термін", fmt_yrs(len(df_real)), delta=f"-{saved_months} міс", delta_color="inverse")
         first_pay = df_base.iloc[0]['Платіж']
-        c3.metric("Базовий платіж", f"{int(first_pay):,} грн")
+        c3.metric("Базовий платіж", f"{first_pay:,.0f} грн")
         st.divider()
 
         # --- Графіки та Таблиці ---
+        # Легкий режим: вбудовані графіки Streamlit (Vega-Lite) замість Plotly — на мобільному
+        # не потрібно вантажити plotly.js і будувати інтерактивні фігури
+        lite_mode = st.checkbox("⚡ Легкий режим (простіші графіки)", key="lite")
+
+        # Фігури Plotly живуть у сесії: будуємо їх один раз, далі лише оновлюємо дані трас
+        charts = st.session_state.setdefault("charts", {})
+        refresh_charts = charts.get("key") != (base_key, real_key)
+        if not lite_mode:
+            charts["key"] = (base_key, real_key)
+
         tab1, tab2, tab3 = st.tabs(["📉 Порівняння", "🍰 Аналіз", "📋 Фінальна таблиця"])
 
         with tab1:
             # Лінійний графік залишку
-            df_chart = pd.concat([
-                df_base[['Місяць', 'Залишок']].assign(Сценарій="План (без доплат)"),
-                df_real[['Місяць', 'Залишок']].assign(Сценарій="Факт (з доплатами)")
-            ])
-            fig = px.line(df_chart, x="Місяць", y="Залишок", color="Сценарій",
-                          color_discrete_map={"План (без доплат)": "#EF553B", "Факт (з доплатами)": "#00CC96"})
-            fig.update_layout(legend=dict(orientation="h", y=1.02, x=1), margin=dict(l=10, r=10, t=30, b=10), height=350, xaxis_title=None)
-            st.plotly_chart(fig, use_container_width=True)
+            base_x, base_y = balance_points(df_base)
+            real_x, real_y = balance_points(df_real)
+            if lite_mode:
+                df_chart = pd.DataFrame({
+                    "Місяць": np.concatenate([base_x, real_x]),
+                    "Залишок": np.concatenate([base_y, real_y]),
+                    "Сценарій": np.repeat(["План (без доплат)", "Факт (з доплатами)"], [len(base_x), len(real_x)])
+                })
+                # Точки сценаріїв після проріджування не збігаються, тож лишаємо довгу форму
+                # і фіксуємо кольори як у Plotly
+                st.vega_lite_chart(
+                    df_chart,
+                    {
+                        "mark": "line",
+                        "encoding": {
+                            "x": {"field": "Місяць", "type": "quantitative"},
+                            "y": {"field": "Залишок", "type": "quantitative"},
+                            "color": {"field": "Сценарій", "type": "nominal",
+                                      "scale": {"domain": ["План (без доплат)", "Факт (з доплатами)"], "range": ["#EF553B", "#00CC96"]},
+                                      "legend": {"orient": "top", "title": None}}
+                        }
+                    },
+                    use_container_width=True, height=350
+                )
+            else:
+                fig = charts.get("line")
+                if fig is None:
+                    fig = balance_figure(base_x, base_y, real_x, real_y)
+                    charts["line"] = fig
+                elif refresh_charts:
+                    fig.update_traces(x=base_x, y=base_y, selector=dict(name="План (без доплат)"))
+                    fig.update_traces(x=real_x, y=real_y, selector=dict(name="Факт (з доплатами)"))
+                st.plotly_chart(fig, use_container_width=True)
 
         with tab2:
             st.subheader("Структура витрат")
-            fig_pie = px.pie(names=['Тіло кредиту', 'Сплачені відсотки'], 
-                             values=[loan_amount, total_int_real], 
-                             hole=0.4, color_discrete_sequence=['#636EFA', '#EF553B'])
-            fig_pie.update_layout(margin=dict(t=20, b=20, l=10, r=10), height=300)
-            st.plotly_chart(fig_pie, use_container_width=True)
+            if lite_mode:
+                st.vega_lite_chart(
+                    pd.DataFrame({"Частина": ['Тіло кредиту', 'Сплачені відсотки'], "Сума": [loan_amount, total_int_real]}),
+                    {
+                        "mark": {"type": "arc", "innerRadius": 60},
+                        "encoding": {
+                            "theta": {"field": "Сума", "type": "quantitative"},
+                            "color": {"field": "Частина", "type": "nominal", "scale": {"domain": ['Тіло кредиту', 'Сплачені відсотки'], "range": ['#636EFA', '#EF553B']}}
+                        }
+                    },
+                    use_container_width=True, height=300
+                )
+            else:
+                fig_pie = charts.get("pie")
+                if fig_pie is None:
+                    fig_pie = cost_figure(loan_amount, total_int_real)
+                    charts["pie"] = fig_pie
+                elif refresh_charts:
+                    fig_pie.update_traces(values=[loan_amount, total_int_real])
+                st.plotly_chart(fig_pie, use_container_width=True)
 
             st.divider()
             st.subheader("Склад платежів")
-            fig_bar = px.bar(df_real, x="Місяць", y=["Відсотки", "Тіло", "Достроково"],
-                             labels={"value": "Сума (грн)", "Місяць": "№ Місяця"},
-                             color_discrete_map={"Відсотки": "#EF553B", "Тіло": "#636EFA", "Достроково": "#00CC96"})
-            fig_bar.update_layout(legend=dict(orientation="h", y=1.02, x=1, title=None), margin=dict(l=10, r=10, t=30, b=10), height=350, xaxis_title=None)
-            st.plotly_chart(fig_bar, use_container_width=True)
+            if lite_mode:
+                st.bar_chart(df_real, x="Місяць", y=["Відсотки", "Тіло", "Достроково"],
+                             color=["#EF553B", "#636EFA", "#00CC96"], height=350)
+            else:
+                fig_bar = charts.get("bar")
+                if fig_bar is None:
+                    fig_bar = payments_figure(df_real["Місяць"].values, df_real["Відсотки"].values,
+                                              df_real["Тіло"].values, df_real["Достроково"].values)
+                    charts["bar"] = fig_bar
+                elif refresh_charts:
+                    for col in ["Відсотки", "Тіло", "Достроково"]:
+                        fig_bar.update_traces(x=df_real["Місяць"].values, y=df_real[col].values, selector=dict(name=col))
+                st.plotly_chart(fig_bar, use_container_width=True)
 
         with tab3:
             # Фінальна таблиця результатів
-            final_df = df_real[["Дата", "Платіж", "Тіло", "Відсотки", "Достроково", "Залишок"]].copy()
-            final_df["Дата"] = final_df["Дата"].apply(lambda x: x.strftime("%d.%m.%y"))
+            # Суми форматує браузер через column_config — сервер віддає сирі числа без Styler і округлення
+            money_cols = ["Платіж", "Тіло", "Відсотки", "Достроково", "Залишок"]
+            final_df = df_real[money_cols]
+            final_df.insert(0, "Дата", df_real["Дата"].dt.strftime("%d.%m.%y"))
+            money_format = st.column_config.NumberColumn(format="%.0f")
             
             st.dataframe(
-                final_df.style.format("{:.0f}", subset=["Платіж", "Тіло", "Відсотки", "Достроково", "Залишок"]), 
+                final_df, 
+                column_config={col: money_format for col in money_cols},
                 use_container_width=True,
                 height=450,
                 hide_index=True
             )
             
-            csv = df_real.to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Завантажити CSV", data=csv, file_name="credit_schedule.csv", mime="text/csv")
\ No newline at end of file
+            # CSV формується лише після натискання кнопки, а не на кожному rerun
+            st.download_button("📥 Завантажити CSV", data=partial(schedule_csv, df_real, real_key), file_name="credit_schedule.csv", mime="text/csv")
\ No newline at end of file